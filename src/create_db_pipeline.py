@@ -6,16 +6,28 @@ This script loads weather data from a CSV file into an SQLite database
 and provides geocoding functionality for weather stations by state.
 """
 
+import math
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
 import pandas as pd
-from sqlalchemy import create_engine, Column, Integer, Float, String, Date, ForeignKey, UniqueConstraint, ForeignKeyConstraint
+import pyarrow.parquet as pq
+from sqlalchemy import create_engine, event, text, Column, Integer, Float, String, Date, ForeignKey, UniqueConstraint, ForeignKeyConstraint, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
+from geopy.adapters import RequestsAdapter
+from geopy.extra.rate_limiter import RateLimiter
 from geopy.geocoders import Nominatim
 from tqdm import tqdm
 
 # Constants
 DATABASE_PATH = 'data/weather_data.db'
-CSV_FILE = 'data/weather_parsed.csv'
+PARQUET_FILE = 'data/weather_parsed.parquet'  # Typed copy of the parsed CSV written by get_data.py
+READ_BATCH_SIZE = 100_000  # Rows read from the Parquet file at a time when loading weather records
+# Column order of weather_records rows written by load_data
+WEATHER_RECORD_COLUMNS = ['precipitation', 'avg_temp', 'max_temp', 'min_temp', 'wind_direction', 'wind_speed',
+                          'date', 'year', 'month', 'week_of', 'station_code', 'state_code']
+GEOCODE_WORKERS = 4  # Concurrent geocoding requests (still rate limited to 1 per second)
 
 # Create SQLAlchemy base
 Base = declarative_base()
@@ -47,6 +59,9 @@ class Station(Base):
     # Define a unique constraint on the composite primary key
     __table_args__ = (
         UniqueConstraint('code', 'state_code', name='uq_station_code_state'),
+        # Indexes for per-state lookups, including only geocoded stations (see validate_geocoded_data.py)
+        Index('idx_stations_state', 'state_code'),
+        Index('idx_stations_geocoded', 'state_code', sqlite_where=text('latitude IS NOT NULL')),
     )
 
 class WeatherRecord(Base):
@@ -72,44 +87,65 @@ class WeatherRecord(Base):
             ['station_code', 'state_code'], 
             ['stations.code', 'stations.state_code']
         ),
+        # Index for per-station time series lookups ordered by date (see plot_time_series.py)
+        Index('idx_wr_station_date', 'station_code', 'date'),
+        # Index for joins to stations on the composite key
+        Index('idx_wr_station_state_date', 'station_code', 'state_code', 'date'),
     )
     
     # Relationships
     station = relationship("Station", back_populates="weather_records",
                          foreign_keys=[station_code, state_code])
 
+class GeocodeCache(Base):
+    __tablename__ = 'geocode_cache'
+    
+    location = Column(String, primary_key=True)  # Geocoded location (e.g., 'Birmingham, AL')
+    latitude = Column(Float, nullable=False)
+    longitude = Column(Float, nullable=False)
+
 
-def get_state_codes_from_csv(csv_file=CSV_FILE):
+def set_sqlite_pragmas(dbapi_connection, connection_record):
     """
-    Extract state codes from the CSV file and return a dictionary mapping state names to codes.
+    Apply SQLite PRAGMAs suited to bulk loading on every new connection.
+    
+    WAL journaling lets readers proceed during the load, and the larger page
+    cache and in-memory temp store keep index builds off the disk.
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA cache_size=-200000")
+    cursor.close()
+
+
+def get_state_codes_from_csv(data_file=PARQUET_FILE):
+    """
+    Extract state codes from the parsed weather data and return a dictionary mapping state names to codes.
     
     Args:
-        csv_file (str): Path to the CSV file containing weather data.
+        data_file (str): Path to the Parquet copy of the parsed CSV weather data.
         
     Returns:
         dict: A dictionary mapping state names to their corresponding codes.
     """
-    # Read CSV file
-    print(f"Reading {csv_file} to extract state codes...")
-    df = pd.read_csv(csv_file)
+    # Read only the columns needed to derive the codes
+    print(f"Reading {data_file} to extract state codes...")
+    df = pd.read_parquet(data_file, columns=['state', 'location'])
     
-    # Create a mapping dictionary
-    state_codes = {}
-    state_code_to_name = {}  # Track which full name goes with each code
+    # Take the code after ', ' in each location (e.g., 'Birmingham, AL' -> 'AL')
+    pairs = pd.DataFrame({
+        'state': df['state'],
+        'code': df['location'].str.split(', ').str[1],
+    }).dropna()
     
-    # First pass: Get all states and their codes from the location column
-    for state_name, group in df.groupby('state'):
-        # Skip if this state name is actually a code (like 'VA' instead of 'Virginia')
-        if len(state_name) == 2 and state_name.isupper():
-            continue
-            
-        # Find the state code from any location entry
-        for location in group['location'].unique():
-            if ', ' in location:
-                state_code = location.split(', ')[1]
-                state_codes[state_name] = state_code
-                state_code_to_name[state_code] = state_name
-                break
+    # Skip state names that are actually codes (like 'VA' instead of 'Virginia')
+    pairs = pairs[pairs['state'].str.len().ne(2) | ~pairs['state'].str.isupper()]
+    
+    # Use the first code found for each state
+    pairs = pairs.drop_duplicates(subset='state')
+    state_codes = dict(zip(pairs['state'], pairs['code']))
     
     # Clean up any states that appear as both code and full name
     # (e.g., both "VA" and "Virginia" in the data)
@@ -129,130 +165,134 @@ class WeatherPipeline:
     def __init__(self):
         """Initialize the pipeline with database connection."""
         self.engine = create_engine(f'sqlite:///{DATABASE_PATH}')
+        event.listen(self.engine, 'connect', set_sqlite_pragmas)
         self.Session = sessionmaker(bind=self.engine)
-        self.geolocator = Nominatim(user_agent="weather-data-pipeline")
+        # Reuse a single HTTP session and honor Nominatim's 1 request/second policy
+        self.geolocator = Nominatim(user_agent="weather-data-pipeline", adapter_factory=RequestsAdapter)
+        self.geocode = RateLimiter(self.geolocator.geocode, min_delay_seconds=1.0,
+                                   max_retries=3, swallow_exceptions=False)
     
     def create_schema(self):
-        """Create the database schema if it doesn't exist."""
+        """Create the database schema and indexes if they don't exist."""
         Base.metadata.create_all(self.engine)
+        
+        # create_all skips indexes on tables that already exist, so add any missing ones
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(self.engine, checkfirst=True)
         print("Database schema created.")
     
     def load_data(self):
-        """Load data from CSV into the SQLite database."""
-        # Read CSV file
-        print(f"Loading data from {CSV_FILE}...")
-        df = pd.read_csv(CSV_FILE)
+        """Load the parsed weather data into the SQLite database."""
+        # Read only the station columns up front; weather records are streamed in batches below
+        print(f"Loading data from {PARQUET_FILE}...")
+        df = pd.read_parquet(PARQUET_FILE, columns=['city', 'code', 'location', 'state'])
         
-        # Create session
-        session = self.Session()
+        # Bulk load through the stdlib sqlite3 driver (the schema is created by the ORM),
+        # as a single transaction with relaxed durability
+        con = sqlite3.connect(DATABASE_PATH)
+        set_sqlite_pragmas(con, None)
+        con.execute("PRAGMA synchronous=OFF")
+        con.execute("BEGIN")
+        try:
+            # Get state codes mapping using the dedicated function
+            state_mapping = get_state_codes_from_csv(PARQUET_FILE)
         
-        # Get state codes mapping using the dedicated function
-        state_mapping = get_state_codes_from_csv(CSV_FILE)
+            # Process and insert data
+            print("Processing states")
+            inserted_codes = set()  # Track codes we've already inserted
+            new_states = []  # Plain dicts for bulk insertion
         
-        # Process and insert data
-        print("Processing states")
-        inserted_codes = set()  # Track codes we've already inserted
+            # Fetch existing states once instead of querying for every state name
+            existing_names = {name for (name,) in con.execute("SELECT name FROM states")}
+            existing_codes = dict(con.execute("SELECT code, name FROM states"))
             
-        for state_name in tqdm(df['state'].unique()):
-            # Skip state names that are actually codes (like 'DE' rather than 'Delaware')
-            if len(state_name) == 2 and state_name.isupper():
-                print(f"Skipping abbreviated state name: {state_name}")
-                continue
+            for state_name in tqdm(df['state'].unique()):
+                # Skip state names that are actually codes (like 'DE' rather than 'Delaware')
+                if len(state_name) == 2 and state_name.isupper():
+                    print(f"Skipping abbreviated state name: {state_name}")
+                    continue
                 
-            # Check if this state already exists in the database
-            state = session.query(State).filter_by(name=state_name).first()
-            if not state:
-                # Get state code from mapping or use first two letters as fallback
-                state_code = state_mapping.get(state_name)
+                # Check if this state already exists in the database
+                if state_name not in existing_names:
+                    # Get state code from mapping or use first two letters as fallback
+                    state_code = state_mapping.get(state_name)
                 
-                if not state_code:
-                    # If no code found in mapping, use first two letters as fallback
-                    state_code = state_name[:2].upper()
-                    print(f"Warning: Using fallback code {state_code} for {state_name}")
+                    if not state_code:
+                        # If no code found in mapping, use first two letters as fallback
+                        state_code = state_name[:2].upper()
+                        print(f"Warning: Using fallback code {state_code} for {state_name}")
                 
-                # Check if this code has already been used
-                if state_code in inserted_codes:
-                    print(f"Skipping duplicate state code: {state_code} for {state_name}")
-                    continue
+                    # Check if this code has already been used
+                    if state_code in inserted_codes:
+                        print(f"Skipping duplicate state code: {state_code} for {state_name}")
+                        continue
                 
-                # Check if this code already exists in the database
-                existing_state = session.query(State).filter_by(code=state_code).first()
-                if existing_state:
-                    print(f"Skipping duplicate state code: {state_code} already used by {existing_state.name}")
-                    continue
+                    # Check if this code already exists in the database
+                    if state_code in existing_codes:
+                        print(f"Skipping duplicate state code: {state_code} already used by {existing_codes[state_code]}")
+                        continue
                     
-                # Insert the new state
-                state = State(code=state_code, name=state_name)
-                session.add(state)
-                inserted_codes.add(state_code)
+                    # Queue the new state
+                    new_states.append({'code': state_code, 'name': state_name})
+                    inserted_codes.add(state_code)
             
-        # Commit states
-        session.commit()
+            # Insert states (committed together with the rest of the load)
+            con.executemany("INSERT INTO states (code, name) VALUES (:code, :name)", new_states)
         
-        print("Processing stations")
-        # Track stations by their code and state_code for later use with weather records
-        stations_map = {}
-            
-        for _, row in tqdm(df[['city', 'code', 'location', 'state']].drop_duplicates().iterrows()):
-            # Get state code for the state name
-            state_code = state_mapping.get(row['state'], row['state'][:2].upper())
-            
-            # Check if this station already exists in the database
-            station = session.query(Station).filter_by(code=row['code'], state_code=state_code).first()
-            
-            if not station:
-                station = Station(
-                    city=row['city'],
-                    code=row['code'],
-                    location=row['location'],
-                    state_code=state_code
-                )
-                session.add(station)
-            
-            # Store both station code and state code for weather records
-            stations_map[row['code']] = {
-                'station_code': row['code'],
-                'state_code': state_code
-            }
-            
-        # Commit stations
-        session.commit()
+            print("Processing stations")
+            stations = df[['city', 'code', 'location', 'state']].drop_duplicates()
+        
+            # Get state code for each state name, falling back to its first two letters
+            stations['state_code'] = stations['state'].map(state_mapping).fillna(stations['state'].str[:2].str.upper())
+            stations = stations.drop(columns='state')
         
-        print("Processing weather records")
-        # Convert date_full to datetime objects
-        df['date'] = pd.to_datetime(df['date_full'])
+            # Insert all stations at once, ignoring any that already exist in the database
+            con.executemany(
+                "INSERT OR IGNORE INTO stations (city, code, location, state_code) VALUES (?, ?, ?, ?)",
+                stations[['city', 'code', 'location', 'state_code']].itertuples(index=False, name=None)
+            )
         
-        # Process in chunks to avoid memory issues
-        chunk_size = 1000
-        for i in tqdm(range(0, len(df), chunk_size)):
-            chunk = df.iloc[i:i+chunk_size]
+            # Track the state code of each station for later use with weather records
+            state_code_by_code = dict(zip(stations['code'], stations['state_code']))
+        
+            print("Processing weather records")
+            # Stream the file in batches so memory stays bounded by the batch size
+            parquet_file = pq.ParquetFile(PARQUET_FILE)
+            num_batches = math.ceil(parquet_file.metadata.num_rows / READ_BATCH_SIZE)
+            insert_weather_record = (
+                f"INSERT INTO weather_records ({', '.join(WEATHER_RECORD_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(WEATHER_RECORD_COLUMNS))})"
+            )
+            for batch in tqdm(parquet_file.iter_batches(batch_size=READ_BATCH_SIZE), total=num_batches):
+                chunk = batch.to_pandas()
             
-            weather_records = []
-            for _, row in chunk.iterrows():
-                station_info = stations_map[row['code']]
-                weather_record = WeatherRecord(
-                    precipitation=row['precipitation'],
-                    avg_temp=row['avg_temp'],
-                    max_temp=row['max_temp'],
-                    min_temp=row['min_temp'],
-                    wind_direction=row['wind_direction'],
-                    wind_speed=row['wind_speed'],
-                    date=row['date'],
-                    year=row['year'],
-                    month=row['month'],
-                    week_of=row['week_of'],
-                    station_code=station_info['station_code'],
-                    state_code=station_info['state_code']
-                )
-                weather_records.append(weather_record)
+                # Convert date_full to datetime objects (a no-op when already parsed in the Parquet file);
+                # an explicit format avoids per-element format inference
+                chunk['date'] = pd.to_datetime(chunk['date_full'], format='%Y-%m-%d', cache=True)
             
-            session.bulk_save_objects(weather_records)
-            session.commit()
+                # Build the weather record columns with vectorized assignment
+                # (dates stored as 'YYYY-MM-DD' text, matching the ORM Date type)
+                chunk['date'] = chunk['date'].dt.strftime('%Y-%m-%d')
+                chunk['station_code'] = chunk['code']
+                chunk['state_code'] = chunk['code'].map(state_code_by_code)
             
-        print("Data loaded successfully!")
+                # Insert the batch as raw tuples with a single executemany
+                con.executemany(insert_weather_record,
+                                chunk[WEATHER_RECORD_COLUMNS].itertuples(index=False, name=None))
+        
+            # Single commit for states, stations and weather records
+            con.commit()
+            print("Data loaded successfully!")
             
-        # Close the session when done
-        session.close()
+        except Exception as e:
+            con.rollback()
+            print(f"Error during data load: {str(e)}")
+            raise
+        finally:
+            # Restore normal durability and close the connection when done
+            con.execute("PRAGMA synchronous=NORMAL")
+            con.close()
     
     def geocode_state(self, state_name):
         """
@@ -274,26 +314,58 @@ class WeatherPipeline:
             stations = session.query(Station).filter_by(state_code=state.code).all()
             print(f"Found {len(stations)} stations to geocode.")
             
-            # Geocode each station
-            for station in tqdm(stations):
+            # Only geocode stations without coordinates
+            pending = []
+            for station in stations:
                 if station.latitude is not None and station.longitude is not None:
                     print(f"Station {station.code} already has coordinates. Skipping.")
                     continue
+                pending.append(station)
+            
+            # Reuse coordinates already cached for these locations
+            locations = {station.location for station in pending}
+            cache = {
+                entry.location: entry
+                for entry in session.query(GeocodeCache).filter(GeocodeCache.location.in_(locations))
+            }
+            
+            # Group uncached stations by location so each location is requested once
+            to_geocode = {}
+            for station in pending:
+                cached = cache.get(station.location)
+                if cached:
+                    station.latitude = cached.latitude
+                    station.longitude = cached.longitude
+                    print(f"Using cached coordinates for {station.location}: ({station.latitude}, {station.longitude})")
+                else:
+                    to_geocode.setdefault(station.location, []).append(station)
+            
+            # Geocode locations (e.g., "Birmingham, AL") concurrently
+            # and apply the results on this thread
+            with ThreadPoolExecutor(max_workers=GEOCODE_WORKERS) as executor:
+                futures = {
+                    executor.submit(self.geocode, location, timeout=10): location
+                    for location in to_geocode
+                }
                 
-                try:
-                    # Use location for geocoding (e.g., "Birmingham, AL")
-                    location = station.location
-                    geocode_result = self.geolocator.geocode(location, timeout=10)
-                    
-                    if geocode_result:
-                        station.latitude = geocode_result.latitude
-                        station.longitude = geocode_result.longitude
-                        print(f"Geocoded {station.location}: ({station.latitude}, {station.longitude})")
-                    else:
-                        print(f"Could not geocode {station.location}")
-                    
-                except Exception as e:
-                    print(f"Error geocoding {station.location}: {str(e)}")
+                for future in tqdm(as_completed(futures), total=len(futures)):
+                    location = futures[future]
+                    try:
+                        geocode_result = future.result()
+                        
+                        if geocode_result:
+                            for station in to_geocode[location]:
+                                station.latitude = geocode_result.latitude
+                                station.longitude = geocode_result.longitude
+                            session.merge(GeocodeCache(location=location,
+                                                       latitude=geocode_result.latitude,
+                                                       longitude=geocode_result.longitude))
+                            print(f"Geocoded {location}: ({geocode_result.latitude}, {geocode_result.longitude})")
+                        else:
+                            print(f"Could not geocode {location}")
+                        
+                    except Exception as e:
+                        print(f"Error geocoding {location}: {str(e)}")
             
             # Commit changes
             session.commit()
@@ -5,33 +5,23 @@ This script reads and parses the data from a pickle file and saves
 it as a CSV file
 """
 
-import pickle, csv      
+import pickle, csv, os
+from multiprocessing import Pool
 # These libraries are part of python 3.11 standard library, 
 # so they dont need to be installed (thus exclude from .toml). 
 # Only load them win them in the environment.
 
+import pandas as pd
+
 # import from the script utils.py
 from src.utils import flatten_row
 
 INPUT_PATH = "data/weather.data"
 OUTPUT_CSV = "data/weather_parsed.csv"
-
-with open(INPUT_PATH, "rb") as f:
-    obj = pickle.load(f)
-
-# Normalize into an iterable of rows
-if isinstance(obj, (list, tuple)):
-    iterable = obj
-elif isinstance(obj, dict):
-    # try to interpret as dict-of-lists
-    try:
-        keys = list(obj.keys())
-        n = len(next(iter(obj.values())))
-        iterable = [tuple(obj[k][i] for k in keys) for i in range(n)]
-    except Exception:
-        iterable = [obj]
-else:
-    iterable = [obj]
+OUTPUT_PARQUET = "data/weather_parsed.parquet"
+DATE_FORMAT = "%Y-%m-%d"  # format of date_full, e.g. 2016-01-03
+BATCH_SIZE = 10_000  # rows buffered per writerows() call
+POOL_CHUNKSIZE = 1000  # rows sent to a worker process at a time
 
 fields = [
     "precipitation","avg_temp","max_temp","min_temp",
@@ -40,21 +30,71 @@ fields = [
     "city","code","location","state"
 ]
 
-rows_written = 0
-skipped = 0
 
-with open(OUTPUT_CSV, "w", newline="", encoding="utf-8") as f:
-    w = csv.DictWriter(f, fieldnames=fields)
-    w.writeheader()
-    for item in iterable:
-        try:
-            rec = flatten_row(item)       # flatten_row() from utils.py
+def format_row(item):
+    """Flatten one item into a CSV row; return None if it can't be parsed."""
+    try:
+        rec = flatten_row(item)       # flatten_row() from utils.py
+
+        # Write the row even if some fields are None; zeros (0) are preserved.
+        return {k: ("" if rec[k] is None else rec[k]) for k in fields}
+
+    except Exception:
+        return None
 
-            # Write the row even if some fields are None; zeros (0) are preserved.
-            w.writerow({k: ("" if rec[k] is None else rec[k]) for k in fields})
-            rows_written += 1
 
+def main():
+    with open(INPUT_PATH, "rb") as f:
+        obj = pickle.load(f)
+
+    # Normalize into an iterable of rows
+    if isinstance(obj, (list, tuple)):
+        iterable = obj
+    elif isinstance(obj, dict):
+        # try to interpret as dict-of-lists
+        try:
+            keys = list(obj.keys())
+            n = len(next(iter(obj.values())))
+            if any(len(obj[k]) < n for k in keys):
+                raise ValueError("Columns have different lengths")
+            # zip is lazy, so rows are yielded one at a time instead of copied into a list
+            iterable = zip(*(obj[k] for k in keys))
         except Exception:
-            skipped += 1
+            iterable = [obj]
+    else:
+        iterable = [obj]
+
+    rows_written = 0
+    skipped = 0
+
+    with open(OUTPUT_CSV, "w", newline="", encoding="utf-8") as f, Pool(os.cpu_count()) as pool:
+        w = csv.DictWriter(f, fieldnames=fields)
+        w.writeheader()
+        batch = []
+        # Parse rows in worker processes; imap keeps the input order and the
+        # single writer here avoids interleaved CSV output
+        for row in pool.imap(format_row, iterable, chunksize=POOL_CHUNKSIZE):
+            if row is None:
+                skipped += 1
+                continue
+            batch.append(row)
+
+            # Write in batches to keep memory bounded with fewer write calls
+            if len(batch) >= BATCH_SIZE:
+                w.writerows(batch)
+                rows_written += len(batch)
+                batch.clear()
+
+        w.writerows(batch)
+        rows_written += len(batch)
+
+    print(f"Wrote {OUTPUT_CSV} with {rows_written} rows. Skipped: {skipped}.")
+
+    # Cache a typed, compressed copy that downstream scripts read instead of the CSV
+    df = pd.read_csv(OUTPUT_CSV, parse_dates=["date_full"], date_format=DATE_FORMAT)
+    df.to_parquet(OUTPUT_PARQUET, compression="zstd", index=False)
+    print(f"Wrote {OUTPUT_PARQUET}.")
+
 
-print(f"Wrote {OUTPUT_CSV} with {rows_written} rows. Skipped: {skipped}.")
+if __name__ == "__main__":
+    main()
@@ -5,21 +5,27 @@ import sys
 
 DB_PATH = 'data/weather_data.db'
 TABLE = 'weather_records'
+# Columns that can be plotted (validated before being placed in the query)
+Y_COLUMNS = ('precipitation', 'avg_temp', 'max_temp', 'min_temp', 'wind_direction', 'wind_speed')
 
 def get_station_data(station_code, y_col):
+    # Column names can't be bound as parameters, so only allow known columns
+    if y_col not in Y_COLUMNS:
+        raise ValueError(f"Unknown column '{y_col}'. Choose one of: {', '.join(Y_COLUMNS)}")
+    
     # Connect to the SQLite database
     conn = sqlite3.connect(DB_PATH)
     
-    # Query to get wind speed data for the given station_id
+    # Query to get the selected column for the given station (station code is bound as a parameter)
     query = f"""
     SELECT date, {y_col}
-    FROM weather_records
-    WHERE station_code = '{station_code}'
+    FROM {TABLE}
+    WHERE station_code = ?
     ORDER BY date;
     """
     
-    # Read the data into a pandas DataFrame
-    df = pd.read_sql_query(query, conn)
+    # Read the data into a pyarrow-backed pandas DataFrame
+    df = pd.read_sql_query(query, conn, params=(station_code,), dtype_backend='pyarrow')
     
     # Close the database connection
     conn.close()
@@ -8,11 +8,19 @@ YDataProfiling to provide a more comprehensive report
 
 import pandas as pd
 
-CSV_FILE = "data/weather_parsed.csv"
+PARQUET_FILE = "data/weather_parsed.parquet"  # written by get_data.py
 
-# Load the CSV data as a DataFrame
-print(f"Loading {CSV_FILE}...")
-df = pd.read_csv(CSV_FILE)
+# Compact column types for profiling
+COLUMN_DTYPES = {
+    "code": "category", "state": "category", "city": "category", "location": "category",
+    "avg_temp": "Int16", "max_temp": "Int16", "min_temp": "Int16", "wind_direction": "Int16",
+    "year": "Int16", "month": "Int8", "week_of": "Int16",
+    "precipitation": "float32", "wind_speed": "float32",
+}
+
+# Load the parsed data as a DataFrame (Parquet keeps the parsed dates and numeric types)
+print(f"Loading {PARQUET_FILE}...")
+df = pd.read_parquet(PARQUET_FILE).astype(COLUMN_DTYPES)
 
 ##### Simple profiling with pandas #####
 def profile_csv(df):
@@ -23,10 +31,9 @@ def profile_csv(df):
     print("\nMissing Values:")
     print(df.isnull().sum())
     print("\nBasic Statistics (numeric columns):")
-    print(df.describe())
+    print(df.describe(include='number'))
     print("\nUnique values in categorical columns:")
-    for col in df.select_dtypes(include=['object']):
-        print(f"{col}: {df[col].nunique()} unique values")
+    print(df.select_dtypes(include=['object', 'category']).nunique())
     print("\nSample rows:")
     print(df.head())
 
@@ -41,7 +48,6 @@ from ydata_profiling import ProfileReport
 
 # Drop columns with all NaN values (prevents profiling errors)
 df = df.dropna(axis=1, how='all')
-df = df.convert_dtypes()
 
 # create and save the profile report
 print("**Generating detailed YDataProfiling profile report**")
@@ -1,6 +1,9 @@
 # ---------- helpers functions ----------
 
-import json
+import re
+from functools import lru_cache, partial
+
+import orjson
 
 # ---------- Reading Data ----------
 def parse_json(x):
@@ -8,29 +11,45 @@ def parse_json(x):
     if isinstance(x, dict):
         return x
     if isinstance(x, (bytes, bytearray)):
-        x = x.decode("utf-8", errors="ignore")
+        try:
+            return orjson.loads(x)  # parses UTF-8 bytes directly
+        except orjson.JSONDecodeError:
+            # fall back to dropping undecodable bytes, then let it raise if malformed
+            x = x.decode("utf-8", errors="ignore")
     if isinstance(x, str):
-        return json.loads(x)  # let it raise if malformed
+        return orjson.loads(x)  # let it raise if malformed
     raise ValueError("Not JSON-like")
 
+# \w is str.isalnum() plus "_", so this matches exactly the non-alnum characters
+_NON_ALNUM = re.compile(r"[\W_]+")
+
+@lru_cache(maxsize=None)
 def normkey(k: str) -> str:
-    """Normalize keys: lowercase, strip, remove non-alnum."""
-    return "".join(ch for ch in k.lower().strip() if ch.isalnum())
+    """Normalize keys: lowercase, remove non-alnum (including whitespace)."""
+    return _NON_ALNUM.sub("", k.lower())
+
+def rget(d: dict, *names, views=None):
+    """Relaxed get: try direct keys, then normalized-key matches.
 
-def rget(d: dict, *names):
-    """Relaxed get: try direct keys, then normalized-key matches."""
+    Pass the same `views` dict to repeated calls to build each dict's
+    normalized-key view only once.
+    """
     if not isinstance(d, dict):
         return None
     # match to direct key
     for name in names:
         if name in d:
             return d[name]
-    # match to normalized key
-    nd = {normkey(k): v for k, v in d.items()}
+    # match to normalized key, reusing a cached view when available
+    nd = views.get(id(d)) if views is not None else None
+    if nd is None:
+        nd = {normkey(k): v for k, v in d.items()}
+        if views is not None:
+            views[id(d)] = nd
     for name in names:
-        v = nd.get(normkey(name))
-        if v is not None or normkey(name) in nd:
-            return v
+        key = normkey(name)
+        if key in nd:
+            return nd[key]
     return None
 
 def to_num(x):
@@ -50,12 +69,14 @@ def to_num(x):
 
 def flatten_row(item):
     """item is usually (weather_json, date_json, station_json)."""
+    # share normalized-key views across lookups so each dict is normalized at most once
+    get = partial(rget, views={})
     if not isinstance(item, (list, tuple)) or len(item) < 3:
         # try dict shape fallback
         if isinstance(item, dict):
-            w = parse_json(rget(item, "weather", "Weather", "w", "data"))
-            d = parse_json(rget(item, "date", "Date", "d"))
-            s = parse_json(rget(item, "station", "Station", "s"))
+            w = parse_json(get(item, "weather", "Weather", "w", "data"))
+            d = parse_json(get(item, "date", "Date", "d"))
+            s = parse_json(get(item, "station", "Station", "s"))
         else:
             # last-ditch: treat entire item as weather
             w, d, s = parse_json(item), {}, {}
@@ -64,22 +85,22 @@ def flatten_row(item):
         d = parse_json(item[1])
         s = parse_json(item[2])
 
-    temp = rget(w, "Temperature") or {}
-    wind = rget(w, "Wind") or {}
+    temp = get(w, "Temperature") or {}
+    wind = get(w, "Wind") or {}
 
     return {
-        "precipitation":  to_num(rget(w, "Precipitation")),
-        "avg_temp":       to_num(rget(temp, "Avg Temp", "AvgTemp", "Average", "Avg")),
-        "max_temp":       to_num(rget(temp, "Max Temp", "MaxTemp", "Max")),
-        "min_temp":       to_num(rget(temp, "Min Temp", "MinTemp", "Min")),
-        "wind_direction": to_num(rget(wind, "Direction", "Dir")),
-        "wind_speed":     to_num(rget(wind, "Speed", "WindSpeed", "Speed(mph)")),
-        "date_full":      rget(d, "Full", "Date", "DateFull"),
-        "year":           to_num(rget(d, "Year")),
-        "month":          to_num(rget(d, "Month")),
-        "week_of":        to_num(rget(d, "Week of", "WeekOf", "Week")),
-        "city":           rget(s, "City"),
-        "code":           rget(s, "Code", "StationCode"),
-        "location":       rget(s, "Location"),
-        "state":          rget(s, "State"),
+        "precipitation":  to_num(get(w, "Precipitation")),
+        "avg_temp":       to_num(get(temp, "Avg Temp", "AvgTemp", "Average", "Avg")),
+        "max_temp":       to_num(get(temp, "Max Temp", "MaxTemp", "Max")),
+        "min_temp":       to_num(get(temp, "Min Temp", "MinTemp", "Min")),
+        "wind_direction": to_num(get(wind, "Direction", "Dir")),
+        "wind_speed":     to_num(get(wind, "Speed", "WindSpeed", "Speed(mph)")),
+        "date_full":      get(d, "Full", "Date", "DateFull"),
+        "year":           to_num(get(d, "Year")),
+        "month":          to_num(get(d, "Month")),
+        "week_of":        to_num(get(d, "Week of", "WeekOf", "Week")),
+        "city":           get(s, "City"),
+        "code":           get(s, "Code", "StationCode"),
+        "location":       get(s, "Location"),
+        "state":          get(s, "State"),
     }
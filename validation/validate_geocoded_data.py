@@ -13,9 +13,9 @@ cursor = conn.cursor()
 
 # Query states with geocoded stations and count
 query = """
-SELECT s.name as state_name, COUNT(st.id) as geocoded_count
+SELECT s.name as state_name, COUNT(st.code) as geocoded_count
 FROM states s
-JOIN stations st ON s.id = st.state_id
+JOIN stations st ON s.code = st.state_code
 WHERE st.latitude IS NOT NULL AND st.longitude IS NOT NULL
 GROUP BY s.name
 ORDER BY geocoded_count DESC
@@ -38,7 +38,7 @@ SELECT
 FROM 
     stations st
 JOIN 
-    states s ON st.state_id = s.id
+    states s ON st.state_code = s.code
 WHERE 
     st.latitude IS NOT NULL AND st.longitude IS NOT NULL
 ORDER BY